@@ -0,0 +1,280 @@
+""" Dashengine Benchmark Suite
+    Measures dashengine throughput offline, using the fake BigQuery backend.
+
+    For each cache backend, the demo application is benchmarked both
+    in-process through the Flask test client and under gunicorn's gthread
+    configuration (as in `start.sh`). Throughput, latency percentiles, peak
+    memory and query cache hit rates are reported for each run.
+
+    Usage (from the repository root):
+        python -m benchmark.run --cache simple filesystem --mode testclient gunicorn
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from ruamel.yaml import YAML
+
+from benchmark.workload import run_workload, summarise
+
+# Repository root, containing `main.py` and the demo application
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Symbolic links making up the benchmark working directory (as in `start.sh`)
+WORKDIR_LINKS = {
+    "pages": os.path.join("demo", "pages"),
+    "queries": os.path.join("demo", "queries"),
+    "stdpages": "stdpages",
+    "README.md": "README.md",
+}
+
+# YAML parser
+yaml = YAML(typ="safe")
+
+
+def _cache_config(backend: str, workdir: str, redis_url: str) -> dict:
+    """Returns the flask-caching configuration for a cache backend."""
+    if backend == "simple":
+        return {"CACHE_TYPE": "SimpleCache"}
+    if backend == "filesystem":
+        return {"CACHE_TYPE": "FileSystemCache", "CACHE_DIR": workdir + "/cache"}
+    if backend == "redis":
+        return {
+            "CACHE_TYPE": "RedisCache",
+            "CACHE_KEY_PREFIX": "dashengine-benchmark",
+            "CACHE_REDIS_URL": redis_url,
+        }
+    raise RuntimeError(f"Unknown cache backend '{backend}'")
+
+
+def _prepare_workdir(args, backend: str) -> str:
+    """Builds a working directory with a benchmark configuration for a backend."""
+    workdir = tempfile.mkdtemp(prefix=f"dashengine-benchmark-{backend}-")
+    for link, target in WORKDIR_LINKS.items():
+        os.symlink(os.path.join(REPOSITORY, target), os.path.join(workdir, link))
+    config = {
+        "APP_NAME": "DashEngine Benchmark",
+        "cache-config": _cache_config(backend, workdir, args.redis_url),
+        "history-config": {"HISTORY_PATH": os.path.join(workdir, "history.sqlite")},
+        "bigquery-config": {
+            "BACKEND": "fake",
+            "FAKE_ROWS": args.rows,
+            "FAKE_LATENCY": args.latency,
+            "FAKE_INT_RANGE": [1500, 2000],
+            "FAKE_COLUMN_TYPES": {
+                "department": "STRING",
+                "n_items": "INT64",
+                "object_begin_date": "INT64",
+            },
+        },
+    }
+    with open(os.path.join(workdir, "config.yaml"), "w") as outfile:
+        yaml.dump(config, outfile)
+    return workdir
+
+
+def _environment() -> dict:
+    """Returns the environment for application processes."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [REPOSITORY] + ([env["PYTHONPATH"]] if "PYTHONPATH" in env else [])
+    )
+    return env
+
+
+def _cache_hit_rate(workdir: str) -> float:
+    """Reads the query cache hit rate from the execution history store."""
+    connection = sqlite3.connect(os.path.join(workdir, "history.sqlite"))
+    hit_rate = connection.execute("SELECT AVG(cache_hit) FROM executions").fetchone()
+    connection.close()
+    return hit_rate[0] or 0.0
+
+
+# Test client #############################################################
+
+
+def _run_testclient(args, workdir: str) -> dict:
+    """Runs the workload in-process through the Flask test client."""
+    output = os.path.join(workdir, "results.json")
+    command = [sys.executable, "-m", "benchmark.worker", "--output", output]
+    command += ["--users", str(args.users), "--sessions", str(args.sessions)]
+    subprocess.run(command, cwd=workdir, env=_environment(), check=True)
+    with open(output, "r") as infile:
+        results = json.load(infile)
+    summary = summarise(results["records"], results["elapsed"])
+    summary["memory"] = results["memory"]
+    return summary
+
+
+# Gunicorn ################################################################
+
+
+def _free_port() -> int:
+    """Returns a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree_rss(pid: int) -> float:
+    """Returns the total resident memory (MB) of a process and its children.
+
+    Reads from /proc, and is therefore only supported on linux.
+    """
+    total = 0.0
+    try:
+        with open(f"/proc/{pid}/status", "r") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    total += float(line.split()[1]) / 1.0e3
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as children:
+            for child in children.read().split():
+                total += _process_tree_rss(int(child))
+    except FileNotFoundError:
+        pass
+    return total
+
+
+def _wait_for_server(url: str, timeout: float = 60):
+    """Waits until the server at `url` responds."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=5)
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+
+def _http_post(base_url: str):
+    """Returns a function posting callback bodies to a live server."""
+
+    def post(route: str, payload: dict) -> tuple:
+        request = urllib.request.Request(
+            base_url + route,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=300) as response:
+            body = response.read()
+            return response.status, json.loads(body) if body else None
+
+    return post
+
+
+def _run_gunicorn(args, workdir: str) -> dict:
+    """Runs the workload over HTTP against gunicorn's gthread configuration."""
+    port = _free_port()
+    command = ["gunicorn", f"--workers={args.workers}", f"--threads={args.threads}"]
+    command += ["--worker-class=gthread", f"--bind=127.0.0.1:{port}", "main:app"]
+    if os.path.isdir("/dev/shm"):
+        command.insert(1, "--worker-tmp-dir=/dev/shm")
+    server = subprocess.Popen(command, cwd=workdir, env=_environment())
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_for_server(base_url + "/")
+
+        # Sample the memory of the server processes during the run
+        peak_rss = [0.0]
+        finished = threading.Event()
+
+        def sample_memory():
+            while not finished.is_set():
+                peak_rss[0] = max(peak_rss[0], _process_tree_rss(server.pid))
+                time.sleep(0.2)
+
+        sampler = threading.Thread(target=sample_memory, daemon=True)
+        sampler.start()
+        records, elapsed = run_workload(_http_post(base_url), args.users, args.sessions)
+        finished.set()
+        sampler.join()
+    finally:
+        server.terminate()
+        server.wait()
+    summary = summarise(records, elapsed)
+    summary["memory"] = peak_rss[0]
+    return summary
+
+
+# Reporting ###############################################################
+
+
+def _report(backend: str, mode: str, summary: dict):
+    """Prints the summary of a benchmark run."""
+    print(f"\n## cache={backend} mode={mode}")
+    print(
+        f"requests: {summary['requests']}  errors: {summary['errors']}  "
+        f"throughput: {summary['throughput']:.1f} req/s  "
+        f"peak memory: {summary['memory']:.1f} MB  "
+        f"query cache hit rate: {summary['hit_rate']:.1%}"
+    )
+    print(f"{'request':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in summary["latency"].items():
+        print(
+            f"{name:<28}{stats['count']:>8}{stats['p50']:>10.1f}"
+            f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="+",
+        default=["simple", "filesystem"],
+        choices=["simple", "filesystem", "redis"],
+    )
+    parser.add_argument(
+        "--mode",
+        nargs="+",
+        default=["testclient", "gunicorn"],
+        choices=["testclient", "gunicorn"],
+    )
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--rows", type=int, default=100000, help="rows per result")
+    parser.add_argument("--latency", type=float, default=0.5, help="query latency (s)")
+    parser.add_argument("--users", type=int, default=8, help="concurrent users")
+    parser.add_argument("--sessions", type=int, default=5, help="sessions per user")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads")
+    parser.add_argument("--output", help="write all results as JSON to this file")
+    parser.add_argument(
+        "--keep-workdir",
+        action="store_true",
+        help="keep the working directories (e.g. to inspect the history store)",
+    )
+    args = parser.parse_args()
+
+    runners = {"testclient": _run_testclient, "gunicorn": _run_gunicorn}
+    results = []
+    for backend in args.cache:
+        for mode in args.mode:
+            workdir = _prepare_workdir(args, backend)
+            try:
+                summary = runners[mode](args, workdir)
+                summary["hit_rate"] = _cache_hit_rate(workdir)
+            finally:
+                # Symbolic links are removed without following them
+                if not args.keep_workdir:
+                    shutil.rmtree(workdir)
+            _report(backend, mode, summary)
+            results.append({"cache": backend, "mode": mode, "summary": summary})
+
+    if args.output is not None:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
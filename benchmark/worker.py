@@ -0,0 +1,39 @@
+""" Benchmark Worker Module
+    Runs the benchmark workload in-process through the Flask test client.
+
+    Must be run from a prepared working directory (see `benchmark.run`), and
+    writes its results as JSON to the `--output` file.
+"""
+import json
+import argparse
+import resource
+
+from benchmark.workload import run_workload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    # Imported here as the application reads its configuration on import
+    from main import app
+
+    def post(route: str, payload: dict) -> tuple:
+        """Sends a request through a fresh test client (one per call)."""
+        response = app.test_client().post(route, json=payload)
+        body = response.get_json() if response.status_code == 200 else None
+        return response.status_code, body
+
+    records, elapsed = run_workload(post, args.users, args.sessions)
+    # Peak resident memory of this process in MB (ru_maxrss is in kB on linux)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1.0e3
+    results = {"records": records, "elapsed": elapsed, "memory": peak_rss}
+    with open(args.output, "w") as outfile:
+        json.dump(results, outfile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+""" Benchmark Workload Module
+    Provides the simulated user sessions driven by the benchmark suite.
+
+    Each session requests the callbacks a user triggers when browsing the Met
+    demo and profiling pages. Requests are sent through a `send` function,
+    such that the same workload drives both the Flask test client and a live
+    gunicorn server.
+"""
+import time
+import random
+import threading
+
+# Dash callback endpoint
+CALLBACK_ROUTE = "/_dash-update-component"
+# Department filters selected by the simulated users (see the fake backend)
+DEPARTMENTS = [None] + [f"department-{i}" for i in range(5)]
+
+
+def _payload(outputs: list, inputs: list) -> dict:
+    """Builds the request body of a dash callback.
+
+    Args:
+        outputs (list): The (component id, property) pairs of the outputs.
+        inputs (list): The (component id, property, value) triples of the inputs.
+
+    Returns:
+        (dict): The JSON body for the dash callback endpoint.
+    """
+    output_specs = [{"id": cid, "property": prop} for cid, prop in outputs]
+    if len(outputs) == 1:
+        output = f"{outputs[0][0]}.{outputs[0][1]}"
+        output_specs = output_specs[0]
+    else:
+        output = ".." + "...".join(f"{cid}.{prop}" for cid, prop in outputs) + ".."
+    return {
+        "output": output,
+        "outputs": output_specs,
+        "inputs": [
+            {"id": cid, "property": prop, "value": value}
+            for cid, prop, value in inputs
+        ],
+        "changedPropIds": [f"{inputs[0][0]}.{inputs[0][1]}"],
+        "state": [],
+    }
+
+
+def _display_page(pathname: str) -> dict:
+    """Returns the callback body for `main.display_page`."""
+    return _payload(
+        [("page-content", "children")],
+        [("url", "pathname", pathname), ("refresh-status", "data", 0)],
+    )
+
+
+def _met_demo_session(send, rng: random.Random):
+    """Simulates a user viewing the Met demo page."""
+    send("display_page:/met-demo", _display_page("/met-demo"))
+    trigger = [("met-trigger", "children", [])]
+    send(
+        "items_by_department",
+        _payload([("met-items-by-department", "figure")], trigger),
+    )
+    send("department_dropdown", _payload([("met-dropdown-filter", "options")], trigger))
+    # Progressive callback: an approximate preview is followed by the exact result
+    preview_id = "met-items-by-date-figure-preview"
+    pending_id = "met-items-by-date-figure-pending"
+    department = rng.choice(DEPARTMENTS)
+    preview = send(
+        "items_by_date:preview",
+        _payload(
+            [(preview_id, "data"), (pending_id, "data")],
+            [("met-dropdown-filter", "value", department)],
+        ),
+    )
+    if preview is not None and pending_id in preview["response"]:
+        pending = preview["response"][pending_id]["data"]
+        send(
+            "items_by_date:exact",
+            _payload(
+                [("met-items-by-date-figure-exact", "data")],
+                [(pending_id, "data", pending)],
+            ),
+        )
+
+
+def _profile_session(send, rng: random.Random):
+    """Simulates a user viewing the profiling page."""
+    send("display_page:/profile", _display_page("/profile"))
+    trigger = [("profile-trigger", "children", [])]
+    send(
+        "profile_summary_chart",
+        _payload([("query-profile-summary-chart", "figure")], trigger),
+    )
+    send("profile_table", _payload([("query-profile-table-div", "children")], trigger))
+    send(
+        "profile_history_charts",
+        _payload(
+            [
+                ("query-history-latency-chart", "figure"),
+                ("query-history-cost-chart", "figure"),
+            ],
+            [("query-history-dropdown", "value", "met-object-creationdate")],
+        ),
+    )
+
+
+def run_workload(post, threads: int, sessions: int, seed: int = 0) -> tuple:
+    """Runs simulated user sessions concurrently.
+
+    Args:
+        post (function): Sends a callback body, returning (status, JSON or None).
+        threads (int): The number of concurrent simulated users.
+        sessions (int): The number of sessions run by each user.
+        seed (int) (optional): Seed for the choices of the simulated users.
+
+    Returns:
+        (tuple): A list of (request name, latency, success) records, and the
+            total elapsed time in seconds.
+    """
+    records = []
+    lock = threading.Lock()
+
+    def user(index: int):
+        rng = random.Random(seed + index)
+
+        def send(name: str, payload: dict):
+            start = time.perf_counter()
+            try:
+                status, body = post(CALLBACK_ROUTE, payload)
+                success = status in (200, 204)
+            except Exception:
+                status, body, success = None, None, False
+            with lock:
+                records.append((name, time.perf_counter() - start, success))
+            return body if status == 200 else None
+
+        for _ in range(sessions):
+            _met_demo_session(send, rng)
+            _profile_session(send, rng)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=user, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return records, time.perf_counter() - start
+
+
+def _percentile(values: list, fraction: float) -> float:
+    """Returns a percentile of a sorted list by nearest rank."""
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarise(records: list, elapsed: float) -> dict:
+    """Summarises workload records into throughput and latency percentiles.
+
+    Args:
+        records (list): The (request name, latency, success) records.
+        elapsed (float): The total elapsed time in seconds.
+
+    Returns:
+        (dict): Overall throughput and error count, and latency percentiles
+            (in milliseconds) per request name and over all requests.
+    """
+    names = sorted(set(name for name, _, _ in records))
+    latencies = {"all": [latency for _, latency, _ in records]}
+    for name in names:
+        latencies[name] = [lat for rname, lat, _ in records if rname == name]
+    summary = {
+        "requests": len(records),
+        "errors": sum(1 for _, _, success in records if not success),
+        "throughput": len(records) / elapsed if elapsed > 0 else 0.0,
+        "latency": {},
+    }
+    for name, values in latencies.items():
+        values = sorted(values)
+        if len(values) == 0:
+            continue
+        summary["latency"][name] = {
+            "count": len(values),
+            "p50": 1e3 * _percentile(values, 0.5),
+            "p95": 1e3 * _percentile(values, 0.95),
+            "p99": 1e3 * _percentile(values, 0.99),
+        }
+    return summary
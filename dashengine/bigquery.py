@@ -1,22 +1,42 @@
 import os
+import time
 import uuid
 import json
 import datetime
+import functools
+import threading
+import contextlib
 import google.auth
 import pandas as pd
 from ruamel.yaml import YAML
 from dataclasses import dataclass
 from google.cloud import bigquery
-from dashengine.dashapp import cache
+from dashengine.dashapp import cache, CONFIGURATION
+from dashengine.fakebigquery import FakeClient
+import dashengine.history as history
 
 # BigQuery
 DIALECT = "standard"
 QUERY_DATA_DIRECTORY = "queries"
-CREDENTIALS, PROJECT_ID = google.auth.default()
+QUERY_CACHE_TIMEOUT = 300
+# Backend selection, "fake" replaces BigQuery with synthetic results
+BIGQUERY_CONFIG = CONFIGURATION.get("bigquery-config", {})
+BACKEND = BIGQUERY_CONFIG.get("BACKEND", "bigquery")
+if BACKEND == "fake":
+    CREDENTIALS, PROJECT_ID = None, None
+else:
+    CREDENTIALS, PROJECT_ID = google.auth.default()
 
 # YAML parser
 yaml = YAML(typ="safe")
 
+# Per-thread stack of dependency recorders (see `record_dependencies`)
+_recorders = threading.local()
+# Per-thread preview mode state (see `preview_mode`)
+_previews = threading.local()
+# Per-thread phase timings of the last executed query (for the history store)
+_executions = threading.local()
+
 
 @dataclass(frozen=True)
 class BigQuery:
@@ -31,6 +51,9 @@ class BigQuery:
         description (str): A short description of the query
         body (str): The query body itself.
         parameter_spec (dict): A dictionary of query parameter specifications keyed by name.
+        preview_body (str): A cheap, approximate variant of the body (or None).
+        preview_fraction (float): The fraction of the data sampled by the
+            preview body, if declared (or None).
     """
 
     query_id: str
@@ -38,6 +61,8 @@ class BigQuery:
     description: str
     body: str
     parameter_spec: dict
+    preview_body: str = None
+    preview_fraction: float = None
 
 
 @dataclass(frozen=True)
@@ -56,6 +81,7 @@ class BigQueryResult:
         duration (datetime.time): The time taken to execute the query.
         bytes_billed (float): The amount of billable bytes processed in BQ.
         bytes_processed (float): The total number of bytes processed in BQ.
+        approximate (bool): True if the result comes from the preview body.
     """
 
     uuid: str
@@ -66,12 +92,56 @@ class BigQueryResult:
     duration: datetime.time
     bytes_billed: float
     bytes_processed: float
+    approximate: bool = False
+
+    @property
+    def sample_fraction(self) -> float:
+        """The fraction of the data sampled by this result.
+
+        This is 1 for exact results, and the declared `fraction` of the query
+        preview for approximate results (or None if the preview declares none).
+        Counts and sums computed over an approximate result may be divided by
+        this fraction to estimate those of the exact result.
+        """
+        return self.source.preview_fraction if self.approximate else 1.0
 
     def memory_usage(self) -> float:
         """Returns the memory usage of the stored dataframe in MB."""
         return self.result.memory_usage(index=True, deep=True).sum() / 1.0e6
 
 
+def _preview_body(query_body: str, preview_spec: dict) -> str:
+    """Builds the body of a query preview from its specification.
+
+    A preview is either specified by an explicit `body` (for example using
+    TABLESAMPLE), or by a row `limit` applied to the full query body. A
+    preview may additionally declare the `fraction` of the data it samples.
+
+    Args:
+        query_body (str): The full query body.
+        preview_spec (dict): The `preview` entry of a query file.
+
+    Returns:
+        (str): The preview query body.
+    """
+    if "body" in preview_spec:
+        return preview_spec["body"]
+    if "limit" in preview_spec:
+        limit = int(preview_spec["limit"])
+        return f"SELECT * FROM (\n{query_body}\n) LIMIT {limit}"
+    raise RuntimeError("Query preview must specify either a 'body' or a 'limit'")
+
+
+def _preview_fraction(preview_spec: dict) -> float:
+    """Reads the sampling fraction declared by a preview specification, if any."""
+    if "fraction" not in preview_spec:
+        return None
+    fraction = float(preview_spec["fraction"])
+    if not 0 < fraction <= 1:
+        raise RuntimeError("Query preview 'fraction' must be within (0, 1]")
+    return fraction
+
+
 def _load_query(query_id: str) -> BigQuery:
     """Loads a query from file by query id.
     This function reads a query from file, according to the provided id, and
@@ -88,6 +158,11 @@ def _load_query(query_id: str) -> BigQuery:
     with open(target_queryfile, "r") as infile:
         try:
             qdata = yaml.load(infile)
+            # Build preview body if the query is progressive
+            preview_body, preview_fraction = None, None
+            if "preview" in qdata:
+                preview_body = _preview_body(qdata["body"], qdata["preview"])
+                preview_fraction = _preview_fraction(qdata["preview"])
             # Build query object
             query_object = BigQuery(
                 query_id,
@@ -95,6 +170,8 @@ def _load_query(query_id: str) -> BigQuery:
                 qdata["description"],
                 qdata["body"],
                 qdata.get("parameters", []),
+                preview_body,
+                preview_fraction,
             )
             return query_object
 
@@ -131,11 +208,41 @@ def fetch_cached_queries() -> list:
         return []
     cached_queries = []
     for query in registry.values():
-        result = run_query(query["query_id"], query["parameters"])
+        result = fetch_query_result(
+            query["query_id"], query["parameters"], query.get("preview", False)
+        )
         cached_queries.append(result)
     return cached_queries
 
 
+def fetch_query_result(
+    query_id: str, parameters: dict, preview: bool = False
+) -> BigQueryResult:
+    """Returns the result of a query for inspection, e.g. by the profiler.
+
+    Unlike `run_query`, the call is not recorded as a dependency of a cached
+    callback output, and cache hits are not recorded in the execution history.
+    The query is executed if its result is not cached, in which case the
+    (billed) execution is recorded in the history.
+
+    Args:
+        query_id (str): A string identifier for the query.
+        parameters (dict): The dictionary of query parameters.
+        preview (bool) (optional): Fetch the preview result of the query.
+
+    Returns:
+        (BigQueryResult): The results of the query.
+    """
+    start = time.perf_counter()
+    _executions.phases = None
+    result = _execute_query(query_id, parameters, preview)
+    if _executions.phases is not None:
+        history.record_execution(
+            result, time.perf_counter() - start, _executions.phases
+        )
+    return result
+
+
 def _build_query_parameters(query: BigQuery, parameters: dict) -> list:
     """Builds the parameter list for a BigQuery job from a supplied
     list of parameter values.
@@ -167,23 +274,148 @@ def _build_query_parameters(query: BigQuery, parameters: dict) -> list:
     return query_params
 
 
-def _register_query(query_id: str, parameters: dict):
+def _client():
+    """Returns a client for the configured BigQuery backend."""
+    if BACKEND == "fake":
+        return FakeClient(BIGQUERY_CONFIG)
+    return bigquery.Client()
+
+
+def _registry_key(query_id: str, parameters: dict, preview: bool = False) -> str:
+    """Returns the key identifying a query and its parameters in the cache."""
+    key = query_id + ":" + json.dumps(parameters, sort_keys=True, default=str)
+    return key + ":preview" if preview else key
+
+
+def _register_query(query_id: str, parameters: dict, preview: bool):
     """Add a query and it's parameters to the query registry.
 
     Note that this is not thread-safe: The registry is meant
     for debug purposes and therefore should normally only be
     run in a single-threaded debug server.
     """
-    registry_key = query_id + ":" + json.dumps(parameters, sort_keys=True, default=str)
+    registry_key = _registry_key(query_id, parameters, preview)
     registry = cache.get("query-registry")
     if registry is None:
         registry = {}
-    registry[registry_key] = {"query_id": query_id, "parameters": parameters}
+    registry[registry_key] = {
+        "query_id": query_id,
+        "parameters": parameters,
+        "preview": preview,
+    }
     cache.set("query-registry", registry)
 
 
-@cache.memoize(timeout=300)
-def run_query(query_id: str, parameters: dict = {}) -> BigQueryResult:
+def _recorder_stack() -> list:
+    """Returns the stack of active dependency recorders for this thread."""
+    if not hasattr(_recorders, "stack"):
+        _recorders.stack = []
+    return _recorders.stack
+
+
+@contextlib.contextmanager
+def record_dependencies():
+    """Records the query results read by `run_query` within this context.
+
+    Yields a dictionary which is filled with every `BigQueryResult` returned
+    by `run_query` while the context is active, keyed by query ID and
+    parameters. Each entry holds the `query_id`, `parameters`, `preview` flag
+    and `uuid` of the result. Contexts may be nested, in which case every
+    enclosing recorder sees the dependency.
+    """
+    dependencies = {}
+    stack = _recorder_stack()
+    stack.append(dependencies)
+    try:
+        yield dependencies
+    finally:
+        stack.pop()
+
+
+def register_dependencies(dependencies: dict):
+    """Adds a set of recorded dependencies to all active recorders."""
+    for recorder in _recorder_stack():
+        recorder.update(dependencies)
+
+
+def fetch_result_uuid(query_id: str, parameters: dict, preview: bool = False) -> str:
+    """Returns the UUID of the currently cached result of a query.
+
+    Whether a result is cached is determined from the memoized result itself.
+    Its UUID is read from a separate, small cache entry such that the result
+    need not be loaded, and is restored from the result should that entry have
+    been evicted independently.
+
+    Args:
+        query_id (str): A string identifier for the query.
+        parameters (dict): The dictionary of query parameters.
+        preview (bool) (optional): Whether to look up the preview result.
+
+    Returns:
+        (str): The UUID of the cached result, or None if it is not cached.
+    """
+    result_key = _execute_query.make_cache_key(
+        _execute_query.uncached, query_id, parameters, preview
+    )
+    if not cache.has(result_key):
+        return None
+    uuid_key = "query-uuid:" + _registry_key(query_id, parameters, preview)
+    result_uuid = cache.get(uuid_key)
+    if result_uuid is None:
+        result = cache.get(result_key)
+        if result is None:
+            return None
+        result_uuid = result.uuid
+        cache.set(uuid_key, result_uuid, timeout=QUERY_CACHE_TIMEOUT)
+    return result_uuid
+
+
+@contextlib.contextmanager
+def preview_mode():
+    """Serves query previews from `run_query` within this context.
+
+    While the context is active, `run_query` returns the approximate preview
+    result of any query declaring a `preview`, unless the exact result is
+    already cached. Yields a dictionary whose `approximate` entry is set to
+    True if any approximate result was returned.
+    """
+    state = {"approximate": False}
+    _previews.state = state
+    try:
+        yield state
+    finally:
+        _previews.state = None
+
+
+def in_preview_mode() -> bool:
+    """Returns True if `preview_mode` is active in the current thread."""
+    return getattr(_previews, "state", None) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _declares_preview(query_id: str) -> bool:
+    """Returns True if a query declares a preview.
+
+    Memoized per process, such that query files are not parsed on every
+    `run_query` call in preview mode.
+    """
+    return _load_query(query_id).preview_body is not None
+
+
+def _use_preview(query_id: str, parameters: dict) -> bool:
+    """Determines whether `run_query` should return a query preview."""
+    if not in_preview_mode() or not _declares_preview(query_id):
+        return False
+    # Prefer the exact result where it is already available
+    if fetch_result_uuid(query_id, parameters) is not None:
+        return False
+    _previews.state["approximate"] = True
+    return True
+
+
+def run_query(
+    query_id: str, parameters: dict = {}, preview: bool = False
+) -> BigQueryResult:
     """Performs a query over BigQuery and returns the result.
 
     This function reads a query from file, according to the provided id, and
@@ -192,37 +424,83 @@ def run_query(query_id: str, parameters: dict = {}) -> BigQueryResult:
     the `queries` subfolder. If the query has parameters, these may be passed
     as elements of a dictionary via the `parameters` argument.
 
+    If the query declares a `preview`, the approximate preview result may be
+    requested with the `preview` argument (see also `preview_mode`).
+
     Args:
         query_id (str): A string identifier for the query.
         parameters (dict) (optional): An optional dictionary of query parameters.
+        preview (bool) (optional): Run the preview variant of the query.
 
     Returns:
         (BigQueryResult): The results of the query.
     """
+    start = time.perf_counter()
+    preview = preview or _use_preview(query_id, parameters)
+    # Phase timings are only set if the query is actually executed
+    _executions.phases = None
+    result = _execute_query(query_id, parameters, preview)
+    register_dependencies(
+        {
+            _registry_key(query_id, parameters, preview): {
+                "query_id": query_id,
+                "parameters": parameters,
+                "preview": preview,
+                "uuid": result.uuid,
+            }
+        }
+    )
+    history.record_execution(result, time.perf_counter() - start, _executions.phases)
+    return result
+
+
+@cache.memoize(timeout=QUERY_CACHE_TIMEOUT)
+def _execute_query(query_id: str, parameters: dict, preview: bool) -> BigQueryResult:
+    """Executes a query in BigQuery, caching the result (see `run_query`)."""
     # Setup BigQuery client
-    client = bigquery.Client()
+    client = _client()
     # Read query
+    start = time.perf_counter()
     query = _load_query(query_id)
+    if preview and query.preview_body is None:
+        raise RuntimeError(f"Query '{query.name}' does not declare a preview")
+    query_body = query.preview_body if preview else query.body
 
     # Build job configuration
     job_config = bigquery.QueryJobConfig()
     job_config.query_parameters = _build_query_parameters(query, parameters)
 
-    # Run query
-    query_result = client.query(query.body, job_config=job_config)
+    # Run query, timing job submission, execution and result download
+    submitted = time.perf_counter()
+    query_result = client.query(query_body, job_config=job_config)
+    executed = time.perf_counter()
+    query_result.result()
+    downloaded = time.perf_counter()
     query_data = query_result.to_dataframe()
+    _executions.phases = {
+        "load": submitted - start,
+        "submit": executed - submitted,
+        "execute": downloaded - executed,
+        "download": time.perf_counter() - downloaded,
+    }
 
     # Register the query in the cache (for the profiler)
-    _register_query(query_id, parameters)
+    _register_query(query_id, parameters, preview)
 
     # Form up results class
-    return BigQueryResult(
+    result = BigQueryResult(
         str(uuid.uuid4()),
         query,
         parameters,
         query_data,
         query_result.ended,
-        (query_result.ended - query_result.started).microseconds / 1.0e6,
+        (query_result.ended - query_result.started).total_seconds(),
         query_result.total_bytes_billed,
         query_result.total_bytes_processed,
+        preview,
     )
+
+    # Record the UUID of the current result (for callback output caching)
+    registry_key = _registry_key(query_id, parameters, preview)
+    cache.set("query-uuid:" + registry_key, result.uuid, timeout=QUERY_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,91 @@
+""" Callback Cache Module
+    Provides memoization of dash callback output.
+"""
+import json
+import functools
+from plotly.io.json import to_json_plotly
+
+# Local project
+from dashengine.dashapp import dashapp, cache
+import dashengine.bigquery as bigquery
+
+
+def _output_key(func, args: tuple) -> str:
+    """Returns the cache key for the output of `func` called with `args`."""
+    name = func.__module__ + "." + func.__qualname__
+    return "callback-output:" + name + ":" + json.dumps(args, default=str)
+
+
+def _dependencies_valid(dependencies: dict) -> bool:
+    """Checks that every query result a cached output was built from is still current."""
+    return all(
+        bigquery.fetch_result_uuid(dep["query_id"], dep["parameters"], dep["preview"])
+        == dep["uuid"]
+        for dep in dependencies.values()
+    )
+
+
+def _plain_output(output):
+    """Converts a callback output (e.g. a figure) to plain JSON-compatible data.
+
+    Plain data is cheap to store and to serialise again, as it requires
+    neither figure validation nor numpy conversion.
+    """
+    return json.loads(to_json_plotly(output))
+
+
+def memoize_output(func, timeout: int = bigquery.QUERY_CACHE_TIMEOUT):
+    """Wraps a callback function such that its output is cached.
+
+    Outputs are keyed by the callback input values, and store the UUIDs of all
+    `BigQueryResult`s read through `bigquery.run_query` while they were built.
+    A cached output is discarded as soon as any of those results is refreshed
+    or expires, so that figures are never served from stale data. Outputs are
+    stored as plain JSON-compatible data: cache hits skip building the output
+    (e.g. figure construction and validation), but dash still serialises the
+    returned data into its response.
+
+    Args:
+        func (function): The callback function.
+        timeout (int) (optional): Cache lifetime of an output in seconds.
+
+    Returns:
+        (function): The wrapped callback function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = _output_key(func, args)
+        entry = cache.get(key)
+        if entry is not None and _dependencies_valid(entry["dependencies"]):
+            bigquery.register_dependencies(entry["dependencies"])
+            return entry["output"]
+
+        with bigquery.record_dependencies() as dependencies:
+            output = func(*args)
+        # Outputs built from approximate previews (see `bigquery.preview_mode`)
+        # are superseded by the exact output, so are not cached
+        if any(dependency["preview"] for dependency in dependencies.values()):
+            return output
+        cache.set(
+            key,
+            {"output": _plain_output(output), "dependencies": dependencies},
+            timeout=timeout,
+        )
+        return output
+
+    return wrapper
+
+
+def cached_callback(*args, timeout: int = bigquery.QUERY_CACHE_TIMEOUT, **kwargs):
+    """Drop-in replacement for `dashapp.callback` which memoizes callback output.
+
+    Arguments are passed on to `dashapp.callback`, see `memoize_output` for
+    the caching behaviour. Callbacks should only be cached if their output
+    depends solely on their inputs and on results of `bigquery.run_query`.
+    """
+
+    def decorator(func):
+        return dashapp.callback(*args, **kwargs)(memoize_output(func, timeout))
+
+    return decorator
@@ -0,0 +1,161 @@
+""" Fake BigQuery Module
+    Provides an offline stand-in for the BigQuery client, for benchmarking.
+
+    The fake client implements the subset of the `google.cloud.bigquery.Client`
+    interface used by `dashengine.bigquery`. Queries are not executed: instead
+    each query returns a synthetic result frame, with columns named after the
+    query's SELECT list, after a configurable latency. The number of rows is
+    reduced accordingly for TABLESAMPLE or LIMIT queries (e.g. previews), and
+    aggregate (GROUP BY) queries return one row per distinct STRING label.
+"""
+import re
+import time
+import zlib
+import datetime
+import numpy as np
+import pandas as pd
+
+# Matches a trailing column alias, e.g. "COUNT(*) as `n_items`"
+_ALIAS = re.compile(r"\s+AS\s+`?(\w+)`?\s*$", re.IGNORECASE)
+
+
+def _split_top_level(text: str) -> list:
+    """Splits a string on commas which are not enclosed in brackets."""
+    items, depth, current = [], 0, ""
+    for char in text:
+        if char == "," and depth == 0:
+            items.append(current)
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current += char
+    items.append(current)
+    return items
+
+
+def _column_names(body: str) -> list:
+    """Infers the result column names of a query from its outermost SELECT list.
+
+    Args:
+        body (str): The query body.
+
+    Returns:
+        (list): The inferred column names, or ["value"] if none could be found.
+    """
+    match = re.search(r"SELECT\s+(.*?)\s+FROM\s", body, re.IGNORECASE | re.DOTALL)
+    if match is None:
+        return ["value"]
+    names = []
+    for item in _split_top_level(match.group(1)):
+        item = item.strip()
+        alias = _ALIAS.search(item)
+        if alias is not None:
+            names.append(alias.group(1))
+        elif re.fullmatch(r"[\w.`]+", item) and not item.endswith("*"):
+            names.append(item.replace("`", "").split(".")[-1])
+    if len(names) == 0:
+        # e.g. "SELECT * FROM (<subquery>)", try the next SELECT list
+        return _column_names(body[match.end() :])
+    return names
+
+
+def _is_aggregate(body: str) -> bool:
+    """Returns True if the query groups its results."""
+    return re.search(r"GROUP\s+BY", body, re.IGNORECASE) is not None
+
+
+def _row_count(body: str, rows: int, cardinality: int) -> int:
+    """Scales the configured number of rows by the clauses of a query.
+
+    Aggregate queries return at most `cardinality` groups, and the number of
+    rows is further reduced by any TABLESAMPLE or LIMIT clause.
+    """
+    if _is_aggregate(body):
+        rows = min(rows, cardinality)
+    sample = re.search(r"TABLESAMPLE\s+SYSTEM\s*\(\s*([\d.]+)\s+PERCENT", body, re.I)
+    if sample is not None:
+        rows = int(rows * float(sample.group(1)) / 100)
+    limit = re.search(r"LIMIT\s+(\d+)\s*$", body, re.IGNORECASE)
+    if limit is not None:
+        rows = min(rows, int(limit.group(1)))
+    return rows
+
+
+class FakeQueryJob:
+    """A fake BigQuery query job.
+
+    Attributes:
+        started (datetime.datetime): The time the job was submitted.
+        ended (datetime.datetime): The time the job completed.
+        total_bytes_billed (float): The synthetic number of billed bytes.
+        total_bytes_processed (float): The synthetic number of processed bytes.
+    """
+
+    def __init__(self, body: str, config: dict):
+        self.body = body
+        self.config = config
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self.ended = None
+        self.total_bytes_billed = None
+        self.total_bytes_processed = None
+
+    def _column(self, rng: np.random.Generator, name: str, rows: int) -> np.ndarray:
+        """Generates a synthetic column according to its configured type."""
+        column_type = self.config.get("FAKE_COLUMN_TYPES", {}).get(name, "FLOAT64")
+        if column_type == "STRING":
+            cardinality = self.config.get("FAKE_STRING_CARDINALITY", 20)
+            labels = np.array([f"{name}-{i}" for i in range(cardinality)])
+            # Groups of an aggregate query are distinct
+            if _is_aggregate(self.body):
+                return labels[:rows]
+            return labels[rng.integers(0, cardinality, rows)]
+        if column_type == "INT64":
+            low, high = self.config.get("FAKE_INT_RANGE", [0, 2000])
+            return rng.integers(low, high, rows)
+        if column_type == "BOOL":
+            return rng.integers(0, 2, rows).astype(bool)
+        if column_type == "FLOAT64":
+            return rng.random(rows)
+        raise RuntimeError(f"Unsupported fake column type '{column_type}'")
+
+    def result(self):
+        """Waits for the job to complete, taking the configured latency."""
+        if self.ended is None:
+            time.sleep(self.config.get("FAKE_LATENCY", 0.0))
+            self.ended = datetime.datetime.now(datetime.timezone.utc)
+        return self
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Waits for the job to complete and returns a synthetic result."""
+        self.result()
+        rows = _row_count(
+            self.body,
+            self.config.get("FAKE_ROWS", 1000),
+            self.config.get("FAKE_STRING_CARDINALITY", 20),
+        )
+        # Results are deterministic for a given query body
+        rng = np.random.default_rng(zlib.crc32(self.body.encode()))
+        result = pd.DataFrame(
+            {
+                name: self._column(rng, name, rows)
+                for name in _column_names(self.body)
+            }
+        )
+        self.total_bytes_processed = float(result.memory_usage(index=False).sum())
+        self.total_bytes_billed = self.total_bytes_processed
+        return result
+
+
+class FakeClient:
+    """A fake BigQuery client, returning synthetic results.
+
+    Args:
+        config (dict): The `bigquery-config` entry of the configuration.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    def query(self, body: str, job_config=None) -> FakeQueryJob:
+        """Submits a fake query job."""
+        return FakeQueryJob(body, self.config)
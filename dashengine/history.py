@@ -0,0 +1,257 @@
+""" History Module
+    Provides a persistent on-disk store of query execution history.
+"""
+import time
+import json
+import queue
+import atexit
+import sqlite3
+import threading
+import pandas as pd
+
+# Local project
+from dashengine.dashapp import CONFIGURATION
+
+# History store configuration. History is disabled if no path is configured.
+HISTORY_CONFIG = CONFIGURATION.get("history-config", {})
+HISTORY_PATH = HISTORY_CONFIG.get("HISTORY_PATH")
+HISTORY_MAX_ROWS = HISTORY_CONFIG.get("HISTORY_MAX_ROWS", 100000)
+HISTORY_QUEUE_SIZE = HISTORY_CONFIG.get("HISTORY_QUEUE_SIZE", 10000)
+
+# Executions waiting to be written by the background writer thread
+_pending = queue.Queue(maxsize=HISTORY_QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    query_id TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    preview INTEGER NOT NULL,
+    cache_hit INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    load_time REAL,
+    submit_time REAL,
+    execute_time REAL,
+    download_time REAL,
+    duration REAL,
+    bytes_billed REAL,
+    bytes_processed REAL,
+    memory REAL,
+    result_uuid TEXT NOT NULL
+)
+"""
+
+
+def history_enabled() -> bool:
+    """Returns True if a history store is configured."""
+    return HISTORY_PATH is not None
+
+
+def _connect() -> sqlite3.Connection:
+    """Opens a connection to the history store, creating it if required."""
+    connection = sqlite3.connect(HISTORY_PATH, timeout=5)
+    # Allows concurrent readers and cheap appends from several workers
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(_SCHEMA)
+    return connection
+
+
+def _row(timestamp: float, result, latency: float, phases: dict) -> tuple:
+    """Builds the history store row for an execution of `run_query`.
+
+    The memory usage of the result is excluded (see `_write_executions`).
+    """
+    cache_hit = phases is None
+    return (
+        timestamp,
+        result.source.query_id,
+        json.dumps(result.parameters, sort_keys=True, default=str),
+        result.approximate,
+        cache_hit,
+        latency,
+        None if cache_hit else phases["load"],
+        None if cache_hit else phases["submit"],
+        None if cache_hit else phases["execute"],
+        None if cache_hit else phases["download"],
+        None if cache_hit else result.duration,
+        None if cache_hit else result.bytes_billed,
+        None if cache_hit else result.bytes_processed,
+        result.uuid,
+    )
+
+
+def _write_executions():
+    """Writes queued executions to the history store until stopped.
+
+    Runs in the background writer thread, which owns a single connection.
+    Executions are written in batches of everything queued at the time. The
+    memory usage of executed results is measured here, as it can be slow for
+    large results. If the store cannot be opened, queued executions are
+    discarded.
+    """
+    import logging
+
+    try:
+        connection = _connect()
+    except sqlite3.Error as exc:
+        logging.error(f"Failed to open query history: {exc}")
+        connection = None
+    stopped = False
+    while not stopped:
+        executions = [_pending.get()]
+        while True:
+            try:
+                executions.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        # A `None` entry signals the writer to stop (see `_stop_writer`)
+        stopped = None in executions
+        executions = [execution for execution in executions if execution is not None]
+        if connection is None:
+            continue
+        # History is diagnostic only, and must never break the writer
+        try:
+            rows = [
+                row + (None if result is None else result.memory_usage(),)
+                for row, result in executions
+            ]
+            with connection:
+                cursor = connection.executemany(
+                    "INSERT INTO executions (time, query_id, parameters, preview,"
+                    " cache_hit, latency, load_time, submit_time, execute_time,"
+                    " download_time, duration, bytes_billed, bytes_processed,"
+                    " result_uuid, memory)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                connection.execute(
+                    "DELETE FROM executions WHERE id <="
+                    " (SELECT MAX(id) FROM executions) - ?",
+                    (HISTORY_MAX_ROWS,),
+                )
+        except Exception as exc:
+            logging.error(f"Failed to record query history: {exc}")
+    if connection is not None:
+        connection.close()
+
+
+def _start_writer():
+    """Starts the background writer thread of this process, if not running."""
+    global _writer
+    with _writer_lock:
+        # Also restarts the writer in processes forked after it was started
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=_write_executions, name="dashengine-history", daemon=True
+            )
+            _writer.start()
+
+
+@atexit.register
+def _stop_writer():
+    """Flushes queued executions to the history store at interpreter exit."""
+    if _writer is not None and _writer.is_alive():
+        _pending.put(None)
+        _writer.join(timeout=5)
+
+
+def record_execution(result, latency: float, phases: dict):
+    """Queues an execution of `run_query` for the history store.
+
+    Executions are written by a background thread, such that the history store
+    never delays a request. Should the queue be full, the execution is dropped.
+    Only scalar values are queued, along with the result of executed queries
+    for measuring its memory usage, such that queued cache hits never hold on
+    to their results.
+
+    Cache misses record the phase timings and BigQuery statistics of the
+    executed job. Cache hits record only their latency, such that summed costs
+    are not double counted. The store is rotated to keep the most recent
+    `HISTORY_MAX_ROWS` executions.
+
+    Args:
+        result (BigQueryResult): The result returned by `run_query`.
+        latency (float): The wall-clock time taken by `run_query` in seconds.
+        phases (dict): Phase timings in seconds, or None for a cache hit.
+    """
+    if not history_enabled():
+        return
+    _start_writer()
+    try:
+        row = _row(time.time(), result, latency, phases)
+        _pending.put_nowait((row, None if phases is None else result))
+    except queue.Full:
+        pass
+
+
+def fetch_history_query_ids() -> list:
+    """Lists all query IDs present in the history store."""
+    if not history_enabled():
+        return []
+    with _connect() as connection:
+        rows = connection.execute(
+            "SELECT DISTINCT query_id FROM executions ORDER BY query_id"
+        ).fetchall()
+    connection.close()
+    return [row[0] for row in rows]
+
+
+def fetch_history(query_id: str) -> pd.DataFrame:
+    """Returns all recorded executions of a query.
+
+    Args:
+        query_id (str): A string identifier for the query.
+
+    Returns:
+        (pandas.DataFrame): One row per execution, indexed by execution time.
+    """
+    with _connect() as connection:
+        history = pd.read_sql_query(
+            "SELECT * FROM executions WHERE query_id = ? ORDER BY time",
+            connection,
+            params=(query_id,),
+        )
+    connection.close()
+    history["time"] = pd.to_datetime(history["time"], unit="s")
+    return history.set_index("time")
+
+
+def summarise_history(query_id: str, frequency: str = "1H") -> pd.DataFrame:
+    """Summarises the execution history of a query over time.
+
+    Latency percentiles are computed over executed queries only (cache
+    misses), separately for exact results and previews, such that they are not
+    dominated by the cache hit rate.
+
+    Args:
+        query_id (str): A string identifier for the query.
+        frequency (str) (optional): A pandas offset alias for the time buckets.
+
+    Returns:
+        (pandas.DataFrame): Per-bucket latency percentiles of exact executions
+            (`p50`, `p95`) and of preview executions (`preview_p50`,
+            `preview_p95`), billed bytes (`bytes_billed`), number of
+            `run_query` calls (`executions`) and cache hit rate (`hit_rate`),
+            indexed by time.
+    """
+    history = fetch_history(query_id)
+    executed = history[history["cache_hit"] == 0]
+    exact = executed[executed["preview"] == 0]["latency"].resample(frequency)
+    preview = executed[executed["preview"] == 1]["latency"].resample(frequency)
+    buckets = history.resample(frequency)
+    summary = pd.DataFrame(
+        {
+            "p50": exact.quantile(0.5),
+            "p95": exact.quantile(0.95),
+            "preview_p50": preview.quantile(0.5),
+            "preview_p95": preview.quantile(0.95),
+            "bytes_billed": buckets["bytes_billed"].sum(),
+            "executions": buckets["latency"].count(),
+            "hit_rate": buckets["cache_hit"].mean(),
+        }
+    )
+    return summary[summary["executions"] > 0]
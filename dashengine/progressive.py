@@ -0,0 +1,93 @@
+""" Progressive Rendering Module
+    Provides callbacks which render query previews before exact results.
+"""
+from dash import dcc, no_update
+from dash.exceptions import PreventUpdate
+from dash.dependencies import Input, Output
+
+# Local project
+from dashengine.dashapp import dashapp
+import dashengine.bigquery as bigquery
+
+# Selects the most recent output for a progressive component. The exact
+# result is only shown if it was computed for the current preview inputs.
+_SELECT_OUTPUT = """
+function(preview, exact) {
+    if (!preview) {
+        return window.dash_clientside.no_update;
+    }
+    if (exact && JSON.stringify(exact.inputs) === JSON.stringify(preview.inputs)) {
+        return exact.output;
+    }
+    return preview.output;
+}
+"""
+
+
+def _store_ids(output: Output) -> tuple:
+    """Returns the IDs of the preview, pending and exact stores for an output."""
+    base = f"{output.component_id}-{output.component_property}"
+    return base + "-preview", base + "-pending", base + "-exact"
+
+
+def progressive_stores(output: Output) -> tuple:
+    """Returns the storage components required by a progressive callback.
+
+    All components must be included in the page layout. The first two
+    (preview and pending) stores should be placed within the `dcc.Loading`
+    component wrapping the output, the last (exact) store outside of it, such
+    that the spinner is shown only until the preview is available.
+
+    Args:
+        output (Output): The output of the progressive callback.
+
+    Returns:
+        (tuple): The preview, pending and exact `dcc.Store` components.
+    """
+    return tuple(dcc.Store(id=store_id) for store_id in _store_ids(output))
+
+
+def progressive_callback(output: Output, inputs: list):
+    """Registers a callback which first renders from query previews.
+
+    The decorated function is first run in `bigquery.preview_mode`, where
+    queries declaring a `preview` return their cheap approximate result. If
+    any approximate result was used, the function is then run again against
+    the exact results, which replace the preview once available. The function
+    may check `BigQueryResult.approximate` to mark its output as approximate.
+
+    Only single-output callbacks are supported. The storage components from
+    `progressive_stores` must be included in the page layout.
+
+    Args:
+        output (Output): The output of the callback.
+        inputs (list): The inputs of the callback.
+    """
+    preview_id, pending_id, exact_id = _store_ids(output)
+
+    def decorator(func):
+        @dashapp.callback(
+            [Output(preview_id, "data"), Output(pending_id, "data")], inputs
+        )
+        def _preview(*args):
+            with bigquery.preview_mode() as state:
+                result = func(*args)
+            # Only the inputs are passed on, such that the exact callback does
+            # not receive the (potentially large) preview output
+            pending = {"inputs": args} if state["approximate"] else no_update
+            return {"inputs": args, "output": result}, pending
+
+        @dashapp.callback(Output(exact_id, "data"), [Input(pending_id, "data")])
+        def _exact(pending):
+            if pending is None:
+                raise PreventUpdate
+            return {"inputs": pending["inputs"], "output": func(*pending["inputs"])}
+
+        dashapp.clientside_callback(
+            _SELECT_OUTPUT,
+            output,
+            [Input(preview_id, "data"), Input(exact_id, "data")],
+        )
+        return func
+
+    return decorator
@@ -1,4 +1,5 @@
 """ Dash Demonstration page for Met Collection data"""
+import numpy as np
 import plotly.graph_objs as go
 from dash import dcc, html
 from dash.dependencies import Input, Output
@@ -6,6 +7,8 @@ from dash.dependencies import Input, Output
 # Local
 from dashengine.dashapp import dashapp
 import dashengine.bigquery as bigquery
+from dashengine.callbackcache import cached_callback, memoize_output
+from dashengine.progressive import progressive_callback, progressive_stores
 
 # Default route
 ROUTE = "/met-demo"
@@ -18,7 +21,7 @@ def __available_departments() -> list:
     return bigquery.run_query("met-objects-by-department").result.department.tolist()
 
 
-@dashapp.callback(
+@cached_callback(
     Output("met-items-by-department", "figure"), [Input("met-trigger", "children")]
 )
 def items_by_department(_) -> go.Figure:
@@ -31,9 +34,10 @@ def items_by_department(_) -> go.Figure:
     return go.Figure(data=[bar], layout=layout)
 
 
-@dashapp.callback(
+@progressive_callback(
     Output("met-items-by-date", "figure"), [Input("met-dropdown-filter", "value")]
 )
+@memoize_output
 def items_by_date(selected_department: str) -> go.Figure:
     """Histogram of items per date, optionally selecting by department."""
     # Running a BQ parametrised query on creation date and departments
@@ -45,14 +49,15 @@ def items_by_date(selected_department: str) -> go.Figure:
             "creation_date": min_creation_date,
             "departments": __available_departments(),
         }
-        query_data = bigquery.run_query("met-object-creationdate", parameters).result
+        query = bigquery.run_query("met-object-creationdate", parameters)
     else:
         # Filter down on a specific department
         parameters = {
             "creation_date": min_creation_date,
             "departments": [selected_department],
         }
-        query_data = bigquery.run_query("met-object-creationdate", parameters).result
+        query = bigquery.run_query("met-object-creationdate", parameters)
+    query_data = query.result
 
     # You also have the option to query on all departments and filter in pandas. e.g:
     # query_data = query_data[ query_data["department"] == selected_department]
@@ -62,11 +67,17 @@ def items_by_date(selected_department: str) -> go.Figure:
         x=query_data["object_begin_date"],
         xbins=dict(start=str(min_creation_date), end="2000", size="M18"),
     )
-    layout = go.Layout(
-        title=go.layout.Title(
-            text="Item count by object creation date", xref="paper", x=0
+    # Mark the chart whilst it is built from the sampled preview
+    title = "Item count by object creation date"
+    if query.approximate and query.sample_fraction is not None:
+        # Weight each sampled item to estimate the counts of the exact result
+        hist.update(
+            y=np.full(len(query_data), 1 / query.sample_fraction), histfunc="sum"
         )
-    )
+        title += f" (estimated from a {query.sample_fraction:.0%} sample)"
+    elif query.approximate:
+        title += " (approximate)"
+    layout = go.Layout(title=go.layout.Title(text=title, xref="paper", x=0))
     return go.Figure(data=[hist], layout=layout)
 
 
@@ -80,6 +91,9 @@ def department_dropdown(_):
 
 
 def layout() -> list:
+    preview_store, pending_store, exact_store = progressive_stores(
+        Output("met-items-by-date", "figure")
+    )
     return [
         # Begin with empty Div: Kicks off callbacks
         html.Div(id="met-trigger", children=[], style={"display": "none"}),
@@ -92,6 +106,8 @@ def layout() -> list:
             children=[
                 dcc.Graph(id="met-items-by-department"),
                 dcc.Graph(id="met-items-by-date"),
+                preview_store,
+                pending_store,
                 dcc.Dropdown(
                     id="met-dropdown-filter",
                     value=None,
@@ -101,4 +117,6 @@ def layout() -> list:
             type="graph",
             fullscreen=True,
         ),
+        # Exact results are stored outside of the loading spinner
+        exact_store,
     ]
@@ -11,6 +11,7 @@ from dash.dependencies import Input, Output
 # DashEngine
 from dashengine.dashapp import dashapp
 import dashengine.bigquery as bigquery
+import dashengine.history as history
 
 # Route for profiling page
 ROUTE = "/profile"
@@ -120,6 +121,7 @@ def _query_profile_table(_) -> dash_table.DataTable:
         {
             "ID": query.source.query_id,
             "UUID": query.uuid,
+            "Result": "Preview" if query.approximate else "Exact",
             "Parameters": json.dumps(query.parameters, default=str),
             "Duration": query.duration,
             "Memory Usage": query.memory_usage(),
@@ -153,7 +155,10 @@ def _query_profile_table(_) -> dash_table.DataTable:
 def _query_profile_body(selected_query) -> dcc.Markdown:
     """Returns the formatted SQL body of the selected query."""
     # Build query body in markdown code block
-    query_code = " ``` \n " + selected_query.source.body + " \n ```"
+    body = selected_query.source.body
+    if selected_query.approximate:
+        body = selected_query.source.preview_body
+    query_code = " ``` \n " + body + " \n ```"
     return dcc.Markdown(query_code)
 
 
@@ -209,7 +214,10 @@ def _query_profile_details(rows, selected_row_indices) -> list:
     # Determine selected UUID
     selected_queryID = rows[selected_row_indices[0]]["ID"]
     selected_params = json.loads(rows[selected_row_indices[0]]["Parameters"])
-    selected_query = bigquery.run_query(selected_queryID, selected_params)
+    selected_preview = rows[selected_row_indices[0]]["Result"] == "Preview"
+    selected_query = bigquery.fetch_query_result(
+        selected_queryID, selected_params, selected_preview
+    )
     return [
         html.H3("Query Details", style={"textAlign": "center", "margin-top": "30px"}),
         html.H4("Query Body", style={"textAlign": "left"}),
@@ -221,16 +229,75 @@ def _query_profile_details(rows, selected_row_indices) -> list:
     ]
 
 
+@dashapp.callback(
+    [
+        Output("query-history-latency-chart", "figure"),
+        Output("query-history-cost-chart", "figure"),
+    ],
+    [Input("query-history-dropdown", "value")],
+)
+def _query_history_charts(query_id: str) -> list:
+    """Generates latency and cost time-series for the selected query."""
+    if query_id is None:
+        return go.Figure(), go.Figure()
+    summary = history.summarise_history(query_id)
+    latency = [
+        go.Scatter(x=summary.index, y=summary[key], name=key, mode="lines+markers")
+        for key in ["p50", "p95", "preview_p50", "preview_p95"]
+        if summary[key].notna().any()
+    ]
+    latency_layout = go.Layout(
+        title=go.layout.Title(text="Execution latency (s)", xref="paper", x=0)
+    )
+    cost = go.Bar(x=summary.index, y=summary["bytes_billed"], name="Bytes Billed")
+    cost_layout = go.Layout(
+        title=go.layout.Title(text="Bytes billed", xref="paper", x=0)
+    )
+    return (
+        go.Figure(data=latency, layout=latency_layout),
+        go.Figure(data=[cost], layout=cost_layout),
+    )
+
+
 # Layout #################################################################
 
 
+def _history_layout() -> list:
+    """Generates the layout for the query execution history."""
+    query_ids = history.fetch_history_query_ids()
+    if len(query_ids) == 0:
+        return []
+    return [
+        html.H3(
+            "Query Execution History",
+            style={"textAlign": "center", "margin-top": "30px"},
+        ),
+        dcc.Dropdown(
+            id="query-history-dropdown",
+            options=[{"label": qid, "value": qid} for qid in query_ids],
+            value=query_ids[0],
+            clearable=False,
+        ),
+        dcc.Loading(
+            id="query-history-loading",
+            children=[
+                dcc.Graph(id="query-history-latency-chart"),
+                dcc.Graph(id="query-history-cost-chart"),
+            ],
+        ),
+    ]
+
+
 def layout() -> list:
     """Generates the layout for the query profiling page."""
     # No queries cached
     if bigquery.fetch_num_cached_queries() == 0:
-        return html.H4(
-            "No queries in cache", style={"textAlign": "center", "margin-top": "30px"}
-        )
+        return [
+            html.H4(
+                "No queries in cache",
+                style={"textAlign": "center", "margin-top": "30px"},
+            )
+        ] + _history_layout()
 
     return [
         html.H3(
@@ -249,4 +316,4 @@ def layout() -> list:
         dcc.Loading(
             id="query-details-loading", children=[html.Div(id="query-profile-details")]
         ),
-    ]
+    ] + _history_layout()